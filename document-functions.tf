@@ -60,6 +60,7 @@ resource "azurerm_linux_function_app" "document_processor" {
 
     # Azure Storage
     "DOCUMENT_STORAGE_CONNECTION"    = "@Microsoft.KeyVault(SecretUri=${azurerm_key_vault_secret.document_storage_connection.id})"
+    "DOCUMENT_STORAGE_ACCOUNT_URL"   = azurerm_storage_account.documents.primary_blob_endpoint
     "INCOMING_CONTAINER"             = azurerm_storage_container.documents_incoming.name
     "PROCESSED_CONTAINER"            = azurerm_storage_container.documents_processed.name
     "FAILED_CONTAINER"               = azurerm_storage_container.documents_failed.name
@@ -73,6 +74,7 @@ resource "azurerm_linux_function_app" "document_processor" {
 
     # Service Bus
     "SERVICEBUS_CONNECTION"          = "@Microsoft.KeyVault(SecretUri=${azurerm_key_vault_secret.servicebus_connection.id})"
+    "SERVICEBUS_FQNS"                = "${azurerm_servicebus_namespace.main.name}.servicebus.windows.net"
     "PROCESSING_QUEUE"               = azurerm_servicebus_queue.document_processing.name
     "COMPLETION_QUEUE"               = azurerm_servicebus_queue.document_extraction_complete.name
 
@@ -82,6 +84,12 @@ resource "azurerm_linux_function_app" "document_processor" {
     "CLAUDE_MODEL"                   = "claude-3-5-sonnet-20241022"
     "MAX_TOKENS"                     = "4096"
 
+    # Service Bus concurrency (overrides host.json so it can be tuned per environment)
+    "MAX_CONCURRENT_CALLS"           = var.max_concurrent_calls
+    "PREFETCH_COUNT"                 = var.max_concurrent_calls * 2
+    "AzureFunctionsJobHost__extensions__serviceBus__maxConcurrentCalls" = var.max_concurrent_calls
+    "AzureFunctionsJobHost__extensions__serviceBus__prefetchCount"      = var.max_concurrent_calls * 2
+
     # Feature Flags
     "ENABLE_MOCK_AI"                 = var.environment == "local" ? "true" : "false"
   }
@@ -124,6 +132,13 @@ resource "azurerm_role_assignment" "doc_function_servicebus_sender" {
   principal_id         = azurerm_linux_function_app.document_processor.identity[0].principal_id
 }
 
+# Role Assignment - Function App to document storage (DOCUMENT_STORAGE_ACCOUNT_URL uses managed identity)
+resource "azurerm_role_assignment" "doc_function_storage_blob" {
+  scope                = azurerm_storage_account.documents.id
+  role_definition_name = "Storage Blob Data Contributor"
+  principal_id         = azurerm_linux_function_app.document_processor.identity[0].principal_id
+}
+
 resource "azurerm_role_assignment" "doc_function_servicebus_receiver" {
   scope                = azurerm_servicebus_namespace.main.id
   role_definition_name = "Azure Service Bus Data Receiver"
@@ -4,6 +4,7 @@ Setup script for creating Cosmos DB database and containers (local development).
 """
 
 from azure.cosmos import CosmosClient, PartitionKey
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import urllib3
 
@@ -40,6 +41,19 @@ CONTAINERS = [
 ]
 
 
+def _create_container(database, container_config):
+    """Create a container, treating an existing container as success."""
+    try:
+        database.create_container(
+            id=container_config["name"],
+            partition_key=PartitionKey(path=container_config["partition_key"]),
+            default_ttl=container_config["default_ttl"]
+        )
+        print(f"✅ Created container: {container_config['name']}")
+    except Exception:
+        print(f"ℹ️  Container already exists: {container_config['name']}")
+
+
 def main():
     print("Setting up Cosmos DB database and containers...")
 
@@ -59,17 +73,9 @@ def main():
             database = client.get_database_client(DATABASE_NAME)
             print(f"ℹ️  Database already exists: {DATABASE_NAME}")
 
-        # Create containers
-        for container_config in CONTAINERS:
-            try:
-                container = database.create_container(
-                    id=container_config["name"],
-                    partition_key=PartitionKey(path=container_config["partition_key"]),
-                    default_ttl=container_config["default_ttl"]
-                )
-                print(f"✅ Created container: {container_config['name']}")
-            except Exception:
-                print(f"ℹ️  Container already exists: {container_config['name']}")
+        # Create containers concurrently (setup time is one round trip, not one per container)
+        with ThreadPoolExecutor(max_workers=len(CONTAINERS)) as executor:
+            list(executor.map(lambda c: _create_container(database, c), CONTAINERS))
 
         print("\n✅ Cosmos DB setup complete!")
         return 0
@@ -3,7 +3,9 @@
 Setup script for creating blob storage containers in Azurite (local development).
 """
 
+from azure.core.exceptions import ResourceExistsError
 from azure.storage.blob import BlobServiceClient
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
 # Azurite connection string
@@ -22,6 +24,17 @@ CONTAINERS = [
 ]
 
 
+def _create_container(blob_service_client, container_name):
+    """Create a container unless it already exists (one round trip either way)."""
+    try:
+        blob_service_client.create_container(container_name)
+        print(f"✅ Created container: {container_name}")
+    except ResourceExistsError:
+        print(f"ℹ️  Container already exists: {container_name}")
+    except Exception as e:
+        print(f"❌ Error creating container {container_name}: {str(e)}")
+
+
 def main():
     print("Setting up blob storage containers...")
 
@@ -29,17 +42,9 @@ def main():
         # Create blob service client
         blob_service_client = BlobServiceClient.from_connection_string(CONNECTION_STRING)
 
-        # Create containers
-        for container_name in CONTAINERS:
-            try:
-                container_client = blob_service_client.get_container_client(container_name)
-                if not container_client.exists():
-                    container_client.create_container()
-                    print(f"✅ Created container: {container_name}")
-                else:
-                    print(f"ℹ️  Container already exists: {container_name}")
-            except Exception as e:
-                print(f"❌ Error creating container {container_name}: {str(e)}")
+        # Create containers concurrently
+        with ThreadPoolExecutor(max_workers=len(CONTAINERS)) as executor:
+            list(executor.map(lambda c: _create_container(blob_service_client, c), CONTAINERS))
 
         print("\n✅ Blob storage setup complete!")
         return 0
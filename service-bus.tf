@@ -113,6 +113,11 @@ resource "azurerm_servicebus_queue" "document_extraction_complete" {
   max_delivery_count                   = 3
   default_message_ttl                  = "P7D" # 7 days
 
+  # Notifications carry MessageId "<documentId>:<status>"; resends are dropped
+  # (changing this setting recreates the queue)
+  requires_duplicate_detection = true
+  duplicate_detection_history_time_window = "PT10M"
+
   lock_duration = "PT2M"
 
   enable_batched_operations = true
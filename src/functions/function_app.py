@@ -1,7 +1,9 @@
 import azure.functions as func
+import asyncio
+import atexit
 import logging
 import os
-import json
+import orjson
 from datetime import datetime
 import uuid
 
@@ -9,20 +11,101 @@ import uuid
 from services.claude_service import ClaudeDocumentProcessor
 from services.storage_service import StorageService
 from services.cosmos_service import CosmosService
-from utils.config import Config
+from utils.config import Config, get_config
+from utils.credentials import close_credential
+from utils.errors import PermanentDocumentError
 
 # Initialize Function App
 app = func.FunctionApp()
 
-# Initialize services
-config = Config()
-claude_processor = ClaudeDocumentProcessor(config)
-storage_service = StorageService(config)
-cosmos_service = CosmosService(config)
-
-logging.basicConfig(level=logging.INFO)
+# Logging handlers and levels are configured by the Functions host (host.json)
 logger = logging.getLogger(__name__)
 
+_utcnow = datetime.utcnow
+
+# Upper bound for the documents listing page size (bounds per-query RU cost)
+MAX_DOCUMENTS_LIMIT = 500
+
+# Health probes hit this every few seconds; the body is static so encode it once
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "version": "1.0.0"})
+
+# Load and validate configuration at cold start so missing settings show up in
+# the startup logs; invocations that need services raise the same error again
+try:
+    get_config()
+except ValueError as e:
+    logger.error("Invalid configuration: %s", e)
+
+# Services are created lazily on first invocation and shared across warm
+# invocations of this worker process
+_services = None
+_services_lock = asyncio.Lock()
+
+
+class Services:
+    """Process-wide service clients shared across warm invocations."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.claude_processor = ClaudeDocumentProcessor(config)
+        self.storage_service = StorageService(config)
+        self.cosmos_service = CosmosService(config)
+
+    async def close(self):
+        """Release pooled connections and the shared credential's refresh state."""
+        try:
+            await asyncio.gather(
+                self.cosmos_service.close(),
+                self.storage_service.close()
+            )
+        finally:
+            await close_credential()
+
+
+async def get_services() -> Services:
+    """
+    Return the shared service clients, creating and warming them on first use.
+
+    Concurrent first invocations coalesce on the lock, so a cold worker builds
+    a single set of clients and pays the Cosmos/Blob warmup only once.
+    """
+    global _services
+    if _services is None:
+        async with _services_lock:
+            if _services is None:
+                services = Services(get_config())
+                await asyncio.gather(
+                    services.cosmos_service.warmup(),
+                    services.storage_service.warmup()
+                )
+                _services = services
+    return _services
+
+
+@atexit.register
+def _close_services():
+    """
+    Close the shared clients when the worker process shuts down.
+
+    The Python worker exposes no async shutdown hook, so this runs the close
+    on a fresh event loop at interpreter exit. Best effort: the process is
+    going away regardless.
+    """
+    if _services is None:
+        return
+    try:
+        asyncio.run(_services.close())
+    except Exception as e:
+        logger.warning("Error closing service clients at shutdown: %s", e)
+
+
+def _stream_size(stream) -> int:
+    """Return the number of bytes remaining in a seekable stream without reading it."""
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END) - position
+    stream.seek(position)
+    return size
+
 
 @app.function_name(name="ProcessDocument")
 @app.service_bus_queue_trigger(
@@ -35,20 +118,27 @@ async def process_document(msg: func.ServiceBusMessage):
     Main document processing function triggered by Service Bus queue.
     Processes documents uploaded to blob storage using Claude AI.
     """
+    services = await get_services()
+
+    # Initialized up front so the failure handler can tell how far processing got
+    job = None
+    blob_url = None
+
     try:
-        logger.info(f"Processing message: {msg.message_id}")
+        logger.info("Processing message: %s", msg.message_id)
+        now_iso = _utcnow().isoformat()
 
         # Parse the Event Grid message
-        event_data = json.loads(msg.get_body().decode('utf-8'))
-        logger.info(f"Event data: {json.dumps(event_data, indent=2)}")
+        event_data = orjson.loads(msg.get_body())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Event data: %s", orjson.dumps(event_data, option=orjson.OPT_INDENT_2).decode())
 
-        # Extract blob information
-        blob_url = event_data.get('data', {}).get('url')
-        if not blob_url:
-            # Handle direct blob URL
-            blob_url = event_data.get('subject', '')
+        # Extract blob information (falls back to the subject for direct blob URLs)
+        event_payload = event_data.get('data')
+        blob_url = (event_payload.get('url') if event_payload else None) or event_data.get('subject', '')
+        user_id = event_data.get('userId', 'anonymous')
 
-        logger.info(f"Processing document from: {blob_url}")
+        logger.info("Processing document from: %s", blob_url)
 
         # Create processing job
         job_id = str(uuid.uuid4())
@@ -56,95 +146,114 @@ async def process_document(msg: func.ServiceBusMessage):
             "id": job_id,
             "documentUrl": blob_url,
             "status": "processing",
-            "createdAt": datetime.utcnow().isoformat(),
-            "updatedAt": datetime.utcnow().isoformat()
+            "createdAt": now_iso,
+            "updatedAt": now_iso
         }
-        await cosmos_service.create_job(job)
+        await services.cosmos_service.create_job(job)
 
         # Download document from blob storage
-        logger.info(f"Downloading document: {blob_url}")
-        document_bytes, content_type = await storage_service.download_document(blob_url)
-
-        # Check document size
-        size_mb = len(document_bytes) / (1024 * 1024)
-        if size_mb > float(config.max_document_size_mb):
-            raise ValueError(f"Document too large: {size_mb:.2f}MB (max: {config.max_document_size_mb}MB)")
+        logger.info("Downloading document: %s", blob_url)
+        # Raises PermanentDocumentError for empty blobs, and before fetching the
+        # body of an oversized one
+        document_bytes, content_type, blob_properties = (
+            await services.storage_service.download_document_with_properties(blob_url)
+        )
+        size_bytes = len(document_bytes)
 
-        logger.info(f"Document downloaded: {size_mb:.2f}MB, type: {content_type}")
+        logger.info("Document downloaded: %d bytes, type: %s", size_bytes, content_type)
 
         # Process document with Claude
         logger.info("Sending document to Claude for processing...")
-        extraction_result = await claude_processor.extract_data(
+        extraction_result = await services.claude_processor.extract_data(
             document_bytes=document_bytes,
             content_type=content_type,
             document_url=blob_url
         )
 
-        logger.info(f"Extraction complete: {len(extraction_result.get('extractedFields', {}))} fields extracted")
+        done_iso = _utcnow().isoformat()
+        extracted_fields = extraction_result.get("extractedFields", {})
+        logger.info("Extraction complete: %d fields extracted", len(extracted_fields))
 
         # Save document metadata to Cosmos DB
+        doc_id = str(uuid.uuid4())
         document_record = {
-            "id": str(uuid.uuid4()),
+            "id": doc_id,
             "blobUrl": blob_url,
-            "uploadDate": datetime.utcnow().isoformat(),
+            "uploadDate": now_iso,
             "status": "completed",
             "contentType": content_type,
-            "sizeBytes": len(document_bytes),
+            "sizeBytes": size_bytes,
             "jobId": job_id,
-            "userId": event_data.get('userId', 'anonymous'),
-            "fileName": blob_url.split('/')[-1]
+            "userId": user_id,
+            "fileName": blob_url.split('?', 1)[0].rpartition('/')[2]
         }
-        await cosmos_service.create_document(document_record)
 
         # Save extracted data to Cosmos DB
+        # Keyed by the document ID (id == partition key) so the write targets a
+        # single logical partition and reads can use a point lookup
         extracted_record = {
-            "id": str(uuid.uuid4()),
-            "documentId": document_record["id"],
-            "extractedFields": extraction_result.get("extractedFields", {}),
+            "id": doc_id,
+            "documentId": doc_id,
+            "extractedFields": extracted_fields,
             "confidence": extraction_result.get("confidence", 0.0),
             "model": extraction_result.get("model", ""),
-            "extractedAt": datetime.utcnow().isoformat(),
+            "extractedAt": done_iso,
             "warnings": extraction_result.get("warnings", []),
             "rawResponse": extraction_result.get("rawResponse", "")
         }
-        await cosmos_service.create_extracted_data(extracted_record)
-
-        # Move document to processed container
-        await storage_service.move_to_processed(blob_url, document_record["id"])
 
         # Update job status
         job["status"] = "completed"
-        job["updatedAt"] = datetime.utcnow().isoformat()
-        job["documentId"] = document_record["id"]
-        await cosmos_service.update_job(job)
+        job["updatedAt"] = done_iso
+        job["documentId"] = doc_id
+
+        # Persist results (document and extracted data concurrently, then the
+        # job; all writes settle before any error is raised, so the failure
+        # handler's job upsert cannot race them)
+        await services.cosmos_service.persist_processing_result(
+            document_record, extracted_record, job
+        )
 
-        # Send completion notification
+        # Send completion notification (mirrors the persisted job record)
         completion_message = {
-            "documentId": document_record["id"],
-            "jobId": job_id,
-            "status": "completed",
-            "fieldsExtracted": len(extraction_result.get('extractedFields', {})),
-            "completedAt": datetime.utcnow().isoformat()
+            "documentId": job["documentId"],
+            "jobId": job["id"],
+            "status": job["status"],
+            "fieldsExtracted": len(extracted_fields),
+            "completedAt": job["updatedAt"]
         }
-        await storage_service.send_completion_notification(completion_message)
 
-        logger.info(f"Document processing completed successfully: {document_record['id']}")
+        # Notify downstream consumers and move the document to the processed
+        # container. Both are best-effort and only run once the results are
+        # persisted, so a failed write never leaves the blob outside the
+        # incoming container. The notification is sent in the background and
+        # is lost if the worker recycles before it goes out.
+        services.storage_service.enqueue_completion_notification(completion_message)
+        await services.storage_service.move_to_processed(blob_url, doc_id, blob_properties)
+
+        logger.info("Document processing completed successfully: %s", doc_id)
 
     except Exception as e:
-        logger.error(f"Error processing document: {str(e)}", exc_info=True)
+        logger.error("Error processing document: %s", e, exc_info=True)
 
         # Update job status to failed
         try:
-            job["status"] = "failed"
-            job["error"] = str(e)
-            job["updatedAt"] = datetime.utcnow().isoformat()
-            await cosmos_service.update_job(job)
+            if job is not None:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                job["updatedAt"] = _utcnow().isoformat()
+                await services.cosmos_service.update_job(job)
 
             # Move to failed container
-            if 'blob_url' in locals():
-                await storage_service.move_to_failed(blob_url, str(e))
+            if blob_url:
+                await services.storage_service.move_to_failed(blob_url, str(e))
         except Exception as inner_e:
-            logger.error(f"Error updating failure status: {str(inner_e)}")
+            logger.error("Error updating failure status: %s", inner_e)
+
+        # Empty or oversized documents fail identically on every delivery; they
+        # are parked in the failed container for manual review instead of retried
+        if isinstance(e, PermanentDocumentError):
+            return
 
         # Re-raise to trigger Service Bus retry
         raise
@@ -158,51 +267,57 @@ async def upload_document(req: func.HttpRequest) -> func.HttpResponse:
     Uploads to blob storage which triggers the Event Grid -> Service Bus flow.
     """
     try:
+        services = await get_services()
+
         # Get file from request
         files = req.files.getlist('file')
         if not files:
             return func.HttpResponse(
-                json.dumps({"error": "No file provided"}),
+                orjson.dumps({"error": "No file provided"}),
                 status_code=400,
                 mimetype="application/json"
             )
 
         file = files[0]
-        file_content = file.read()
 
-        # Validate file size
-        size_mb = len(file_content) / (1024 * 1024)
-        if size_mb > float(config.max_document_size_mb):
+        # Validate file size without materializing the upload in memory; the
+        # part's own Content-Length is client-controlled, so measure the stream
+        size_bytes = _stream_size(file.stream)
+        if size_bytes > services.config.max_document_size_bytes:
             return func.HttpResponse(
-                json.dumps({"error": f"File too large: {size_mb:.2f}MB (max: {config.max_document_size_mb}MB)"}),
+                orjson.dumps({
+                    "error": f"File too large: {size_bytes / (1024 * 1024):.2f}MB "
+                             f"(max: {services.config.max_document_size_mb}MB)"
+                }),
                 status_code=400,
                 mimetype="application/json"
             )
 
         # Upload to blob storage
-        blob_url = await storage_service.upload_document(
+        blob_url = await services.storage_service.upload_document(
             file_name=file.filename,
-            file_content=file_content,
-            content_type=file.content_type
+            file_stream=file.stream,
+            content_type=file.content_type,
+            length=size_bytes
         )
 
-        logger.info(f"Document uploaded: {blob_url}")
+        logger.info("Document uploaded: %s", blob_url)
 
         return func.HttpResponse(
-            json.dumps({
+            orjson.dumps({
                 "message": "Document uploaded successfully",
                 "blobUrl": blob_url,
                 "fileName": file.filename,
-                "sizeBytes": len(file_content)
+                "sizeBytes": size_bytes
             }),
             status_code=200,
             mimetype="application/json"
         )
 
     except Exception as e:
-        logger.error(f"Error uploading document: {str(e)}", exc_info=True)
+        logger.error("Error uploading document: %s", e, exc_info=True)
         return func.HttpResponse(
-            json.dumps({"error": str(e)}),
+            orjson.dumps({"error": str(e)}),
             status_code=500,
             mimetype="application/json"
         )
@@ -215,15 +330,24 @@ async def get_documents(req: func.HttpRequest) -> func.HttpResponse:
     HTTP endpoint to retrieve document processing history.
     """
     try:
+        services = await get_services()
+
         # Get query parameters
-        limit = int(req.params.get('limit', '50'))
+        try:
+            limit = min(max(int(req.params.get('limit', '50')), 1), MAX_DOCUMENTS_LIMIT)
+        except ValueError:
+            return func.HttpResponse(
+                orjson.dumps({"error": "limit must be an integer"}),
+                status_code=400,
+                mimetype="application/json"
+            )
         status = req.params.get('status')
 
         # Query Cosmos DB
-        documents = await cosmos_service.get_documents(limit=limit, status=status)
+        documents = await services.cosmos_service.get_documents(limit=limit, status=status)
 
         return func.HttpResponse(
-            json.dumps({
+            orjson.dumps({
                 "documents": documents,
                 "count": len(documents)
             }),
@@ -232,9 +356,9 @@ async def get_documents(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     except Exception as e:
-        logger.error(f"Error retrieving documents: {str(e)}", exc_info=True)
+        logger.error("Error retrieving documents: %s", e, exc_info=True)
         return func.HttpResponse(
-            json.dumps({"error": str(e)}),
+            orjson.dumps({"error": str(e)}),
             status_code=500,
             mimetype="application/json"
         )
@@ -247,28 +371,29 @@ async def get_extracted_data(req: func.HttpRequest) -> func.HttpResponse:
     HTTP endpoint to retrieve extracted data for a specific document.
     """
     try:
+        services = await get_services()
         document_id = req.route_params.get('document_id')
 
         # Query Cosmos DB
-        extracted_data = await cosmos_service.get_extracted_data(document_id)
+        extracted_data = await services.cosmos_service.get_extracted_data(document_id)
 
         if not extracted_data:
             return func.HttpResponse(
-                json.dumps({"error": "Document not found"}),
+                orjson.dumps({"error": "Document not found"}),
                 status_code=404,
                 mimetype="application/json"
             )
 
         return func.HttpResponse(
-            json.dumps(extracted_data),
+            orjson.dumps(extracted_data),
             status_code=200,
             mimetype="application/json"
         )
 
     except Exception as e:
-        logger.error(f"Error retrieving extracted data: {str(e)}", exc_info=True)
+        logger.error("Error retrieving extracted data: %s", e, exc_info=True)
         return func.HttpResponse(
-            json.dumps({"error": str(e)}),
+            orjson.dumps({"error": str(e)}),
             status_code=500,
             mimetype="application/json"
         )
@@ -281,11 +406,7 @@ async def health_check(req: func.HttpRequest) -> func.HttpResponse:
     Health check endpoint for monitoring.
     """
     return func.HttpResponse(
-        json.dumps({
-            "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
-            "version": "1.0.0"
-        }),
+        _HEALTH_BODY,
         status_code=200,
         mimetype="application/json"
     )
@@ -1,52 +1,160 @@
+import asyncio
+import heapq
+import itertools
+import json
 import logging
-from azure.cosmos.aio import CosmosClient
+import orjson
+from cachetools import TTLCache
+from functools import lru_cache
+from azure.cosmos.aio import ContainerProxy, CosmosClient
 from azure.cosmos import exceptions, PartitionKey
-from azure.identity.aio import DefaultAzureCredential
-from typing import Dict, Any, List, Optional
+from azure.cosmos import _synchronized_request
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from utils.config import Config
+from utils.credentials import get_credential
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of feed ranges (physical partitions) queried at the same time
+QUERY_FANOUT_CONCURRENCY = 8
+
+
+class _OrjsonJsonModule:
+    """
+    Stand-in for the `json` module used by the Cosmos SDK request serializer.
+
+    dumps() is served by orjson (compact output, as the SDK requests) and falls
+    back to the stdlib for anything orjson rejects; every other attribute
+    resolves to the stdlib json module.
+    """
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            return json.dumps(obj, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+# Request bodies (create_item/upsert_item) are serialized in this SDK module;
+# swap its json reference only, leaving the rest of the process untouched
+if getattr(_synchronized_request, "json", None) is json:
+    _synchronized_request.json = _OrjsonJsonModule()
+
+
+@lru_cache(maxsize=None)
+def _get_cosmos_client(endpoint: str) -> CosmosClient:
+    """
+    Return the process-wide CosmosClient for an account endpoint.
+
+    One client per account per process keeps a single address/partition cache
+    and AAD token cache, however many services are constructed.
+    """
+    return CosmosClient(endpoint, credential=get_credential())
+
+
+@lru_cache(maxsize=None)
+def _get_container_client(endpoint: str, database: str, container: str) -> ContainerProxy:
+    """Return the process-wide container client for a container."""
+    return _get_cosmos_client(endpoint).get_database_client(database).get_container_client(container)
+
 
 class CosmosService:
     """Service for interacting with Azure Cosmos DB."""
 
     def __init__(self, config: Config):
         self.config = config
-        self.credential = DefaultAzureCredential()
         self.client = None
         self.database = None
         self.documents_container = None
         self.extracted_container = None
         self.jobs_container = None
+        # Read-through cache for extracted data (records are write-once)
+        self._extracted_cache: TTLCache = TTLCache(
+            maxsize=config.extracted_data_cache_size,
+            ttl=config.extracted_data_cache_ttl_seconds
+        )
 
     async def _ensure_initialized(self):
         """Ensure Cosmos client is initialized."""
         if self.client is None:
-            self.client = CosmosClient(
-                self.config.cosmos_endpoint,
-                credential=self.credential
+            endpoint = self.config.cosmos_endpoint
+            database = self.config.cosmos_database
+            self.client = _get_cosmos_client(endpoint)
+            self.database = self.client.get_database_client(database)
+            self.documents_container = _get_container_client(
+                endpoint, database, self.config.cosmos_documents_container
             )
-            self.database = self.client.get_database_client(self.config.cosmos_database)
-            self.documents_container = self.database.get_container_client(
-                self.config.cosmos_documents_container
+            self.extracted_container = _get_container_client(
+                endpoint, database, self.config.cosmos_extracted_container
             )
-            self.extracted_container = self.database.get_container_client(
-                self.config.cosmos_extracted_container
+            self.jobs_container = _get_container_client(
+                endpoint, database, self.config.cosmos_jobs_container
             )
-            self.jobs_container = self.database.get_container_client(
-                self.config.cosmos_jobs_container
+
+    async def __aenter__(self) -> "CosmosService":
+        await self._ensure_initialized()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the process-wide Cosmos client and release its connections.
+
+        The client is shared through the module-level factories, so those
+        caches are cleared as well; a later request builds a fresh client.
+        The shared AAD credential is owned by the caller (see
+        utils.credentials.close_credential).
+        """
+        if self.client is None:
+            return
+        client = self.client
+        self.client = None
+        self.database = None
+        self.documents_container = None
+        self.extracted_container = None
+        self.jobs_container = None
+        _get_container_client.cache_clear()
+        _get_cosmos_client.cache_clear()
+        await client.close()
+        logger.info("Cosmos DB client closed")
+
+    async def warmup(self):
+        """
+        Prime the client's address and partition caches.
+
+        Issues one cheap metadata read per container so the first data-plane
+        request does not pay the cache population cost. Best effort: failures
+        are logged and the regular request path initializes lazily instead.
+        """
+        try:
+            await self._ensure_initialized()
+            await asyncio.gather(
+                self.documents_container.read(),
+                self.extracted_container.read(),
+                self.jobs_container.read()
             )
+            logger.info("Cosmos DB client warmed up")
+        except Exception as e:
+            logger.warning("Cosmos DB warmup failed: %s", e)
 
     async def create_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
         """Create a document record in Cosmos DB."""
         try:
             await self._ensure_initialized()
             result = await self.documents_container.create_item(body=document)
-            logger.info(f"Created document record: {document['id']}")
+            logger.debug("Created document record: %s", document["id"])
             return result
-        except Exception as e:
-            logger.error(f"Error creating document in Cosmos DB: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error creating document in Cosmos DB",
+                extra={"op": "create_document", "doc_id": document.get("id")}
+            )
             raise
 
     async def create_extracted_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -54,10 +162,14 @@ class CosmosService:
         try:
             await self._ensure_initialized()
             result = await self.extracted_container.create_item(body=data)
-            logger.info(f"Created extracted data record: {data['id']}")
+            self._extracted_cache.pop(data["documentId"], None)
+            logger.debug("Created extracted data record: %s", data["id"])
             return result
-        except Exception as e:
-            logger.error(f"Error creating extracted data in Cosmos DB: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error creating extracted data in Cosmos DB",
+                extra={"op": "create_extracted_data", "doc_id": data.get("documentId")}
+            )
             raise
 
     async def create_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
@@ -65,10 +177,13 @@ class CosmosService:
         try:
             await self._ensure_initialized()
             result = await self.jobs_container.create_item(body=job)
-            logger.info(f"Created job record: {job['id']}")
+            logger.debug("Created job record: %s", job["id"])
             return result
-        except Exception as e:
-            logger.error(f"Error creating job in Cosmos DB: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error creating job in Cosmos DB",
+                extra={"op": "create_job", "job_id": job.get("id")}
+            )
             raise
 
     async def update_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
@@ -76,67 +191,183 @@ class CosmosService:
         try:
             await self._ensure_initialized()
             result = await self.jobs_container.upsert_item(body=job)
-            logger.info(f"Updated job record: {job['id']}")
+            logger.debug("Updated job record: %s", job["id"])
             return result
-        except Exception as e:
-            logger.error(f"Error updating job in Cosmos DB: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error updating job in Cosmos DB",
+                extra={"op": "update_job", "job_id": job.get("id"), "status": job.get("status")}
+            )
             raise
 
+    async def persist_processing_result(
+        self,
+        document: Dict[str, Any],
+        extracted: Dict[str, Any],
+        job: Dict[str, Any]
+    ):
+        """
+        Persist the outcome of processing one document.
+
+        The three records live in different containers (and partitions), so a
+        transactional batch cannot span them. The document and extracted-data
+        writes are issued concurrently, and both settle before the first error
+        is re-raised, so callers never race a still-pending write.
+
+        The job is updated only after both succeed: it reports on them (and
+        ProcessingJobs is partitioned on /status, so a premature "completed"
+        upsert would leave a separate item behind if a write then failed).
+        """
+        results = await asyncio.gather(
+            self.create_document(document),
+            self.create_extracted_data(extracted),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        await self.update_job(job)
+
+    async def persist_batch(
+        self,
+        records: Iterable[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+        concurrency: int = 16
+    ) -> List[Optional[BaseException]]:
+        """
+        Persist the outcomes of a batch of processed documents concurrently.
+
+        Args:
+            records: (document, extracted, job) tuples, as taken by
+                persist_processing_result
+            concurrency: Maximum number of documents written at the same time,
+                bounding the RU spike a large batch can cause
+
+        Returns:
+            One entry per record, in order: None if it was persisted, otherwise
+            the exception raised while persisting it. A failed record does not
+            stop the rest of the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def persist_one(record):
+            async with semaphore:
+                await self.persist_processing_result(*record)
+
+        results = await asyncio.gather(
+            *(persist_one(record) for record in records),
+            return_exceptions=True
+        )
+        return [result if isinstance(result, BaseException) else None for result in results]
+
     async def get_documents(
         self,
         limit: int = 50,
         status: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get documents with optional filtering."""
+        """
+        Get documents with optional filtering.
+
+        The Documents container is partitioned by upload date, so this is a
+        cross-partition query. Each feed range is queried concurrently for its
+        own top `limit` rows and the pages are merged by upload date.
+        """
         try:
             await self._ensure_initialized()
 
             # Build query
+            # Parameterized so the query text (and its cached plan) is constant
+            parameters = [{"name": "@limit", "value": limit}]
             if status:
-                query = f"SELECT * FROM c WHERE c.status = @status ORDER BY c.uploadDate DESC OFFSET 0 LIMIT {limit}"
-                parameters = [{"name": "@status", "value": status}]
+                query = "SELECT * FROM c WHERE c.status = @status ORDER BY c.uploadDate DESC OFFSET 0 LIMIT @limit"
+                parameters.append({"name": "@status", "value": status})
             else:
-                query = f"SELECT * FROM c ORDER BY c.uploadDate DESC OFFSET 0 LIMIT {limit}"
-                parameters = []
-
-            items = []
-            async for item in self.documents_container.query_items(
-                query=query,
-                parameters=parameters,
-                enable_cross_partition_query=True
-            ):
-                items.append(item)
-
-            logger.info(f"Retrieved {len(items)} documents")
+                query = "SELECT * FROM c ORDER BY c.uploadDate DESC OFFSET 0 LIMIT @limit"
+
+            feed_ranges = [fr async for fr in self.documents_container.read_feed_ranges()]
+            semaphore = asyncio.Semaphore(QUERY_FANOUT_CONCURRENCY)
+
+            async def query_feed_range(feed_range):
+                # A single page of up to `limit` items is all one range can contribute
+                async with semaphore:
+                    pages = self.documents_container.query_items(
+                        query=query,
+                        parameters=parameters,
+                        feed_range=feed_range,
+                        max_item_count=limit
+                    ).by_page()
+                    async for page in pages:
+                        return [item async for item in page]
+                    return []
+
+            pages = await asyncio.gather(*(query_feed_range(fr) for fr in feed_ranges))
+            items = heapq.nlargest(
+                limit,
+                itertools.chain.from_iterable(pages),
+                key=lambda item: item.get("uploadDate", "")
+            )
+
+            logger.debug("Retrieved %d documents", len(items))
             return items
 
-        except Exception as e:
-            logger.error(f"Error querying documents: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error querying documents",
+                extra={"op": "get_documents", "limit": limit, "status": status}
+            )
             raise
 
     async def get_extracted_data(self, document_id: str) -> Optional[Dict[str, Any]]:
-        """Get extracted data for a specific document."""
+        """
+        Get extracted data for a specific document.
+
+        Extracted records are stored with id == documentId (the partition key),
+        so this is a single-partition point read. Records written before that
+        convention fall back to a query scoped to the same partition.
+
+        Hits are cached in-process for a short TTL, since dashboards and retries
+        request the same document repeatedly. Misses are not cached.
+        """
+        cached = self._extracted_cache.get(document_id)
+        if cached is not None:
+            return cached
+
         try:
             await self._ensure_initialized()
 
+            try:
+                item = await self.extracted_container.read_item(
+                    item=document_id,
+                    partition_key=document_id
+                )
+                logger.debug("Retrieved extracted data for document: %s", document_id)
+                self._extracted_cache[document_id] = item
+                return item
+            except exceptions.CosmosResourceNotFoundError:
+                pass
+
             query = "SELECT * FROM c WHERE c.documentId = @documentId"
             parameters = [{"name": "@documentId", "value": document_id}]
 
-            items = []
-            async for item in self.extracted_container.query_items(
-                query=query,
-                parameters=parameters,
-                enable_cross_partition_query=True
-            ):
-                items.append(item)
+            items = [
+                item async for item in self.extracted_container.query_items(
+                    query=query,
+                    parameters=parameters,
+                    partition_key=document_id
+                )
+            ]
 
             if items:
-                logger.info(f"Retrieved extracted data for document: {document_id}")
+                logger.debug("Retrieved extracted data for document: %s", document_id)
+                self._extracted_cache[document_id] = items[0]
                 return items[0]
             else:
-                logger.warning(f"No extracted data found for document: {document_id}")
+                logger.warning("No extracted data found for document: %s", document_id)
                 return None
 
-        except Exception as e:
-            logger.error(f"Error getting extracted data: {str(e)}")
+        except Exception:
+            logger.exception(
+                "Error getting extracted data",
+                extra={"op": "get_extracted_data", "doc_id": document_id}
+            )
             raise
@@ -33,18 +33,70 @@ This service demonstrates distributed storage and event-driven messaging pattern
    - Metadata preservation on failures for debugging
 """
 
+import asyncio
+import hashlib
 import logging
-from azure.storage.blob import BlobServiceClient, ContentSettings
+import re
+from functools import lru_cache
+from azure.storage.blob import BlobProperties, ContentSettings
+from azure.storage.blob.aio import BlobClient, BlobServiceClient, ContainerClient, ExponentialRetry
 from azure.servicebus.aio import ServiceBusClient
 from azure.servicebus import ServiceBusMessage
-import json
-from typing import Tuple, Dict, Any
+from azure.servicebus.exceptions import MessageSizeExceededError
+import orjson
+from typing import Tuple, Dict, Any, AsyncIterator, BinaryIO, List, Optional, Set
 from datetime import datetime
-import uuid
+import secrets
 from utils.config import Config
+from utils.credentials import get_credential
+from utils.errors import DocumentTooLargeError, EmptyDocumentError
 
 logger = logging.getLogger(__name__)
 
+_utcnow = datetime.utcnow
+
+# Backoff for blob copies that the service completes asynchronously
+COPY_POLL_INITIAL_DELAY_SECONDS = 0.1
+COPY_POLL_MAX_DELAY_SECONDS = 2.0
+COPY_POLL_TIMEOUT_SECONDS = 60.0
+
+# Retry tuning. The SDK defaults back off 15s+ (Blob) and up to 120s (Service
+# Bus), which stalls invocations during partial outages; these retry up to 5
+# times with jittered exponential backoff capped at about 8s.
+# Blob backoff is initial_backoff + increment_base ** attempt: ~1.7s .. ~7.8s
+BLOB_RETRY_POLICY_KWARGS: Dict[str, Any] = {
+    "initial_backoff": 0.2,
+    "increment_base": 1.5,
+    "retry_total": 5,
+    "random_jitter_range": 0.5,
+}
+SERVICEBUS_RETRY_KWARGS: Dict[str, Any] = {
+    "retry_mode": "exponential",
+    "retry_total": 5,
+    "retry_backoff_factor": 0.5,
+    "retry_backoff_max": 8,
+}
+
+
+def _compact_timestamp(ts: datetime) -> str:
+    """Format a datetime as YYYYMMDDHHMMSS (same as strftime("%Y%m%d%H%M%S"), without the format parsing)."""
+    return f"{ts.year:04d}{ts.month:02d}{ts.day:02d}{ts.hour:02d}{ts.minute:02d}{ts.second:02d}"
+
+
+@lru_cache(maxsize=None)
+def _get_blob_service(account_url: str, connection_string: str) -> BlobServiceClient:
+    """
+    Return the process-wide BlobServiceClient for a storage account.
+
+    With an account URL the client authenticates with the shared AAD
+    credential (managed identity in Azure); otherwise it falls back to the
+    connection string (local development, Azurite).
+    """
+    retry_policy = ExponentialRetry(**BLOB_RETRY_POLICY_KWARGS)
+    if account_url:
+        return BlobServiceClient(account_url, credential=get_credential(), retry_policy=retry_policy)
+    return BlobServiceClient.from_connection_string(connection_string, retry_policy=retry_policy)
+
 
 class StorageService:
     """
@@ -72,15 +124,20 @@ class StorageService:
     - Pub/sub pattern allows multiple consumers
     """
 
+    # scheme://<host>/<container>/<blob-path>[?query]; compiled once, and
+    # faster than urlsplit() for the unique URLs seen per event
+    _BLOB_URL = re.compile(r"https?://[^/]+/([^/?#]+)/([^?#]+)")
+
     def __init__(self, config: Config):
         """
         Initialize storage and messaging clients.
 
         CONNECTION MANAGEMENT:
-        - BlobServiceClient uses connection pooling for efficiency
+        - Async BlobServiceClient keeps an aiohttp connection pool
         - Reused across multiple operations in same instance
-        - Azure Functions runtime manages instance lifecycle
-        - Connections automatically recycled on instance recycling
+        - Network calls are awaited, so the event loop keeps serving other
+          invocations while a blob request is in flight
+        - Pool released by close() at worker shutdown
 
         Args:
             config: Configuration with connection strings
@@ -89,10 +146,75 @@ class StorageService:
 
         # Initialize blob storage client
         # In production, uses managed identity instead of connection string
-        self.blob_service_client = BlobServiceClient.from_connection_string(
+        # Shared per account so every instance reuses one connection pool
+        self.blob_service_client = _get_blob_service(
+            config.blob_account_url,
             config.document_storage_connection
         )
 
+        # Container clients for the pipeline containers, built once and reused
+        # for every blob operation (see _get_blob_client)
+        self._container_clients: Dict[str, ContainerClient] = {
+            name: self.blob_service_client.get_container_client(name)
+            for name in (
+                config.incoming_container,
+                config.processed_container,
+                config.failed_container
+            )
+        }
+
+        # Service Bus client and completion-queue sender, opened on first send
+        # and reused so each notification skips the AMQP connection handshake
+        self._sb_client: Optional[ServiceBusClient] = None
+        self._sender = None
+        self._sender_lock = asyncio.Lock()
+
+        # Background notification sends (see enqueue_completion_notification)
+        self._notification_semaphore = asyncio.Semaphore(config.notification_concurrency)
+        self._pending_notifications: Set[asyncio.Task] = set()
+
+    async def warmup(self):
+        """
+        Open the storage connection pool before the first request needs it.
+
+        Reads the properties of each pipeline container (one cheap request each),
+        which also surfaces missing containers at cold start. Best effort:
+        failures are logged and not raised.
+        """
+        try:
+            await asyncio.gather(*(
+                container_client.get_container_properties()
+                for container_client in self._container_clients.values()
+            ))
+            logger.info("Blob storage client warmed up")
+        except Exception as e:
+            logger.warning(f"Blob storage warmup failed: {str(e)}")
+
+    async def close(self):
+        """
+        Close the process-wide blob client and release its connection pool.
+
+        The client is shared through _get_blob_service, so that cache is
+        cleared as well; a later request builds a fresh client.
+        """
+        client = self.blob_service_client
+        sender, sb_client = self._sender, self._sb_client
+        self._sender = self._sb_client = None
+        _get_blob_service.cache_clear()
+        try:
+            # Let queued notifications go out before their sender is closed
+            await self.drain()
+        finally:
+            # Each client is closed even if draining or another close fails
+            for resource in (client, sender, sb_client):
+                if resource is None:
+                    continue
+                try:
+                    await resource.close()
+                except Exception as e:
+                    logger.warning(f"Error closing {type(resource).__name__}: {str(e)}")
+            logger.info("Storage and messaging clients closed")
+
     async def download_document(self, blob_url: str) -> Tuple[bytes, str]:
         """
         Download a document from blob storage.
@@ -122,8 +244,27 @@ class StorageService:
             Tuple of (document bytes, content type)
 
         Raises:
+            DocumentTooLargeError: If the blob exceeds MAX_DOCUMENT_SIZE_MB
+            EmptyDocumentError: If the blob is empty
             Exception: On download failure (triggers Service Bus retry)
         """
+        document_bytes, content_type, _ = await self.download_document_with_properties(blob_url)
+        return document_bytes, content_type
+
+    async def download_document_with_properties(
+        self,
+        blob_url: str
+    ) -> Tuple[bytes, str, BlobProperties]:
+        """
+        Download a document along with the blob's properties.
+
+        Same as download_document, but also returns the properties that came
+        with the download response (content settings, user metadata), so they
+        can be passed on to move_to_processed without another request.
+
+        Returns:
+            Tuple of (document bytes, content type, blob properties)
+        """
         try:
             # STEP 1: Parse URL to extract container and blob path
             # Blob URL format: https://{account}.blob.core.windows.net/{container}/{blob}
@@ -131,37 +272,113 @@ class StorageService:
 
             # STEP 2: Get client for specific blob
             # Client maintains connection to storage account
-            blob_client = self.blob_service_client.get_blob_client(
-                container=container_name,
-                blob=blob_name
-            )
+            blob_client = self._get_blob_client(container_name, blob_name)
 
             # STEP 3: Download blob content
-            # This is a synchronous operation but wrapped in async context
-            # For true async, use aio version of SDK
-            download_stream = blob_client.download_blob()
-            document_bytes = download_stream.readall()
+            # Async SDK: the event loop is free while the bytes are in flight
+            # readall() assembles the blob into a single buffer; it is passed by
+            # reference through the pipeline without further copies
+            # Chunks beyond the initial range are fetched in parallel
+            download_stream = await blob_client.download_blob(
+                max_concurrency=self.config.blob_download_concurrency
+            )
+
+            # FAIL FAST: The first response carries the full blob size, so
+            # empty and oversized blobs are rejected before the rest is fetched
+            if download_stream.size == 0:
+                raise EmptyDocumentError(f"Blob is empty: {blob_name}")
+            if download_stream.size > self.config.max_document_size_bytes:
+                raise DocumentTooLargeError(
+                    f"Document too large: {download_stream.size / (1024 * 1024):.2f}MB "
+                    f"(max: {self.config.max_document_size_mb}MB)"
+                )
+
+            document_bytes = await download_stream.readall()
 
             # STEP 4: Get metadata (content type) from blob properties
             # Properties include: size, last modified, content type, custom metadata
-            properties = blob_client.get_blob_properties()
+            # They arrive with the download response, so no extra request is needed
+            properties = download_stream.properties
             content_type = properties.content_settings.content_type or "application/octet-stream"
 
             # OBSERVABILITY: Log successful download with size
             logger.info(f"Downloaded blob: {blob_name} ({len(document_bytes)} bytes)")
 
-            return document_bytes, content_type
+            return document_bytes, content_type, properties
 
         except Exception as e:
             # ERROR HANDLING: Log and re-raise to trigger retry mechanism
             logger.error(f"Error downloading document from {blob_url}: {str(e)}")
             raise  # Service Bus will retry message
 
+    async def download_documents(self, blob_urls: List[str]) -> List[Tuple[bytes, str]]:
+        """
+        Download several documents concurrently.
+
+        BATCH PREFETCH PATTERN:
+        - When a batch of blob-created events arrives, the downloads overlap
+          instead of running one after another
+        - At most BLOB_DOWNLOAD_CONCURRENCY blobs are in flight at a time
+
+        Args:
+            blob_urls: Full URLs of the blobs
+
+        Returns:
+            (document bytes, content type) per URL, in the same order
+
+        Raises:
+            Exception: On the first download failure
+        """
+        semaphore = asyncio.Semaphore(self.config.blob_download_concurrency)
+
+        async def download_one(blob_url: str) -> Tuple[bytes, str]:
+            async with semaphore:
+                return await self.download_document(blob_url)
+
+        return await asyncio.gather(*(download_one(blob_url) for blob_url in blob_urls))
+
+    async def download_document_stream(self, blob_url: str) -> AsyncIterator[bytes]:
+        """
+        Download a document from blob storage as a stream of chunks.
+
+        STREAMING PATTERN:
+        - Only one chunk (4 MB by default) is held in memory at a time
+        - Consumers can process each chunk while the next one downloads
+        - Peak memory no longer grows with document size x concurrency
+
+        Use download_document when the whole document is needed in memory
+        anyway (e.g. for the Claude request); it fetches chunks in parallel,
+        whereas this iterator fetches them one after another.
+
+        Args:
+            blob_url: Full URL of the blob (from Event Grid event)
+
+        Yields:
+            Consecutive chunks of the blob content
+
+        Raises:
+            Exception: On download failure (triggers Service Bus retry)
+        """
+        try:
+            container_name, blob_name = self._parse_blob_url(blob_url)
+            blob_client = self._get_blob_client(container_name, blob_name)
+
+            download_stream = await blob_client.download_blob()
+            async for chunk in download_stream.chunks():
+                yield chunk
+
+            logger.info(f"Streamed blob: {blob_name} ({download_stream.size} bytes)")
+
+        except Exception as e:
+            logger.error(f"Error streaming document from {blob_url}: {str(e)}")
+            raise
+
     async def upload_document(
         self,
         file_name: str,
-        file_content: bytes,
-        content_type: str
+        file_stream: BinaryIO,
+        content_type: str,
+        length: Optional[int] = None
     ) -> str:
         """
         Upload a document to the incoming container.
@@ -177,9 +394,9 @@ class StorageService:
 
         NAMING STRATEGY:
         - Timestamp for temporal ordering
-        - UUID for uniqueness (prevents collisions)
+        - Random hex suffix for uniqueness (prevents collisions)
         - Original filename preserved (for debugging)
-        - Format: YYYYMMDDHHMMSS_UUID_originalname.ext
+        - Format: YYYYMMDDHHMMSS_RANDOM_originalname.ext
 
         IDEMPOTENCY:
         - Same file can be uploaded multiple times
@@ -187,10 +404,16 @@ class StorageService:
         - No duplicate document detection at this level
         - Downstream deduplication based on content hash if needed
 
+        STREAMING UPLOAD:
+        - File content is read from the stream in chunks by the SDK
+        - Avoids holding a second full copy of large documents in memory
+        - Blocks are uploaded in parallel (max_concurrency)
+
         Args:
             file_name: Original filename from client
-            file_content: File content as bytes
+            file_stream: File-like object positioned at the start of the content
             content_type: MIME type of the file
+            length: Number of bytes to upload (read to end of stream if None)
 
         Returns:
             URL of the uploaded blob (for tracking/reference)
@@ -200,26 +423,25 @@ class StorageService:
         """
         try:
             # STEP 1: Generate unique, time-ordered blob name
-            # DISTRIBUTED ID GENERATION: Combine timestamp + UUID
+            # DISTRIBUTED ID GENERATION: Combine timestamp + random suffix
             # - Timestamp ensures chronological ordering
-            # - UUID ensures uniqueness across distributed uploads
+            # - 32 random bits ensure uniqueness across distributed uploads
             # - No central coordination required
-            timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
+            timestamp = _compact_timestamp(_utcnow())
+            unique_id = secrets.token_hex(4)
             blob_name = f"{timestamp}_{unique_id}_{file_name}"
 
             # STEP 2: Get blob client for upload
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.config.incoming_container,
-                blob=blob_name
-            )
+            blob_client = self._get_blob_client(self.config.incoming_container, blob_name)
 
             # STEP 3: Upload blob with metadata
             # CONTENT SETTINGS: Store MIME type for downstream processing
             # OVERWRITE: True allows re-upload if needed
-            blob_client.upload_blob(
-                file_content,
+            await blob_client.upload_blob(
+                file_stream,
+                length=length,
                 overwrite=True,
+                max_concurrency=4,
                 content_settings=ContentSettings(content_type=content_type)
             )
 
@@ -236,7 +458,12 @@ class StorageService:
             logger.error(f"Error uploading document: {str(e)}")
             raise
 
-    async def move_to_processed(self, source_blob_url: str, document_id: str):
+    async def move_to_processed(
+        self,
+        source_blob_url: str,
+        document_id: str,
+        properties: Optional[BlobProperties] = None
+    ):
         """
         Move a document from incoming to processed container.
 
@@ -266,42 +493,39 @@ class StorageService:
         Args:
             source_blob_url: URL of blob in incoming container
             document_id: Unique document ID from Cosmos DB
+            properties: Source blob properties from the download, if available.
+                The processed copy then carries the source metadata plus a
+                documentId entry, written by the copy request itself
         """
         try:
             # STEP 1: Parse source blob URL
             container_name, blob_name = self._parse_blob_url(source_blob_url)
 
             # STEP 2: Get source blob client
-            source_client = self.blob_service_client.get_blob_client(
-                container=container_name,
-                blob=blob_name
-            )
+            source_client = self._get_blob_client(container_name, blob_name)
 
             # STEP 3: Create destination path with document ID organization
             # This creates a virtual folder structure for organization
             dest_blob_name = f"{document_id}/{blob_name}"
-            dest_client = self.blob_service_client.get_blob_client(
-                container=self.config.processed_container,
-                blob=dest_blob_name
-            )
+            dest_client = self._get_blob_client(self.config.processed_container, dest_blob_name)
 
             # STEP 4: Copy blob to destination
             # COPY PATTERN: Preserve original, then delete
             # - Atomic server-side copy operation
             # - No data transfer through client
             # - Preserves all metadata and properties
-            dest_client.start_copy_from_url(source_client.url)
-
-            # STEP 5: Wait for copy to complete
-            # TODO: In production, implement async polling with exponential backoff
-            # Current implementation uses simple delay (good enough for POC)
-            import asyncio
-            await asyncio.sleep(2)
+            # STEP 5: Returns once the copy has committed (see _copy_blob)
+            metadata = None
+            if properties is not None:
+                # Copy Blob replaces metadata when it is given, so start from
+                # the source's and add the document ID for downstream lookups
+                metadata = {**(properties.metadata or {}), "documentId": document_id}
+            await self._copy_blob(source_client, dest_client, metadata=metadata)
 
             # STEP 6: Delete source blob
             # Two-phase operation: copy then delete
             # If delete fails, blob remains in incoming (safe to retry)
-            source_client.delete_blob()
+            await source_client.delete_blob()
 
             logger.info(f"Moved blob to processed: {dest_blob_name}")
 
@@ -343,38 +567,39 @@ class StorageService:
             container_name, blob_name = self._parse_blob_url(source_blob_url)
 
             # STEP 2: Get source blob client
-            source_client = self.blob_service_client.get_blob_client(
-                container=container_name,
-                blob=blob_name
-            )
+            source_client = self._get_blob_client(container_name, blob_name)
 
             # STEP 3: Create timestamped path in failed container
             # Organization: failed/{timestamp}/{original_name}
             # Enables chronological analysis of failures
-            timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+            failed_at = _utcnow()
+            timestamp = _compact_timestamp(failed_at)
             dest_blob_name = f"{timestamp}_failed/{blob_name}"
-            dest_client = self.blob_service_client.get_blob_client(
-                container=self.config.failed_container,
-                blob=dest_blob_name
-            )
+            dest_client = self._get_blob_client(self.config.failed_container, dest_blob_name)
 
             # STEP 4: Copy blob to failed container
-            dest_client.start_copy_from_url(source_client.url)
+            await self._copy_blob(source_client, dest_client)
 
-            # STEP 5: Add error metadata to blob
+            # STEP 5: Add error metadata to blob and delete the source
             # METADATA PATTERN: Store diagnostic information with blob
             # - Error message truncated to avoid metadata size limits
             # - Timestamp for correlation with logs
             # - Queryable via blob metadata queries
-            dest_client.set_blob_metadata({
-                "error": error_message[:256],  # Azure metadata limit
-                "failed_at": datetime.utcnow().isoformat()
-            })
-
-            # STEP 6: Wait and delete source
-            import asyncio
-            await asyncio.sleep(2)
-            source_client.delete_blob()
+            # The copy has committed, so both requests are independent and
+            # are issued concurrently; each one's failure is logged separately
+            metadata_result, delete_result = await asyncio.gather(
+                dest_client.set_blob_metadata({
+                    "error": error_message[:256],  # Azure metadata limit
+                    "failed_at": failed_at.isoformat()
+                }),
+                source_client.delete_blob(),
+                return_exceptions=True
+            )
+            if isinstance(metadata_result, Exception):
+                logger.error(f"Error setting failure metadata on {dest_blob_name}: {str(metadata_result)}")
+            if isinstance(delete_result, Exception):
+                logger.error(f"Error deleting failed source blob {blob_name}: {str(delete_result)}")
+                return
 
             logger.info(f"Moved blob to failed: {dest_blob_name}")
 
@@ -422,33 +647,17 @@ class StorageService:
             message: Completion event payload (document ID, status, metadata)
         """
         try:
-            # STEP 1: Create Service Bus client
-            # ASYNC CONTEXT MANAGER: Ensures proper resource cleanup
-            # Client created per operation (lightweight)
-            async with ServiceBusClient.from_connection_string(
-                self.config.servicebus_connection
-            ) as client:
-                # STEP 2: Get sender for completion queue
-                sender = client.get_queue_sender(self.config.completion_queue)
-
-                async with sender:
-                    # STEP 3: Create Service Bus message
-                    # MESSAGE PROPERTIES:
-                    # - Content: JSON serialized event data
-                    # - Content-Type: Enables message routing and filtering
-                    # - Session ID: Can be added for ordered processing
-                    sb_message = ServiceBusMessage(
-                        json.dumps(message),
-                        content_type="application/json"
-                    )
-
-                    # STEP 4: Send message
-                    # DELIVERY SEMANTICS:
-                    # - Message persisted to Service Bus storage
-                    # - Replicated across availability zones
-                    # - Guaranteed delivery to subscribers
-                    # - TTL of 14 days (configurable)
-                    await sender.send_messages(sb_message)
+            # STEP 1: Get the shared sender for the completion queue
+            # Opened once per worker; the AMQP link stays up between calls
+            sender = await self._get_sender()
+
+            # STEP 2: Send message
+            # DELIVERY SEMANTICS:
+            # - Message persisted to Service Bus storage
+            # - Replicated across availability zones
+            # - Guaranteed delivery to subscribers
+            # - TTL of 14 days (configurable)
+            await sender.send_messages(self._build_notification(message))
 
             # OBSERVABILITY: Log successful notification
             logger.info(f"Sent completion notification for document: {message.get('documentId')}")
@@ -461,6 +670,187 @@ class StorageService:
             logger.error(f"Error sending completion notification: {str(e)}")
             # Don't raise - this is not critical
 
+    async def send_completion_notifications(self, messages: List[Dict[str, Any]]):
+        """
+        Send several completion notifications in as few requests as possible.
+
+        Messages are packed into ServiceBusMessageBatch objects; a batch is sent
+        whenever the next message would exceed its size limit, so any number
+        of messages can be passed.
+
+        Same best-effort semantics as send_completion_notification: failures
+        are logged, not raised.
+
+        Args:
+            messages: Completion event payloads
+        """
+        if not messages:
+            return
+        try:
+            sender = await self._get_sender()
+            batch = await sender.create_message_batch()
+            for message in messages:
+                sb_message = self._build_notification(message)
+                try:
+                    batch.add_message(sb_message)
+                except MessageSizeExceededError:
+                    # Batch is full: send it and start a new one with this message
+                    await sender.send_messages(batch)
+                    batch = await sender.create_message_batch()
+                    batch.add_message(sb_message)
+            await sender.send_messages(batch)
+
+            logger.info(f"Sent {len(messages)} completion notifications")
+
+        except Exception as e:
+            logger.error(f"Error sending completion notifications: {str(e)}")
+
+    def enqueue_completion_notification(self, message: Dict[str, Any]) -> asyncio.Task:
+        """
+        Send a completion notification in the background.
+
+        FIRE-AND-FORGET PATTERN:
+        - Returns immediately; the Service Bus round trip is not on the
+          caller's latency path
+        - In-flight sends are capped by NOTIFICATION_CONCURRENCY
+        - Failures are logged by send_completion_notification, never raised
+
+        Pending sends are tracked so drain() can wait for them. They are not
+        durable: the worker's shutdown hook runs on a fresh event loop and
+        cannot wait for them, so notifications still queued when the worker
+        recycles are lost (the job record in Cosmos DB remains the source of
+        truth).
+
+        Args:
+            message: Completion event payload (document ID, status, metadata)
+
+        Returns:
+            The background task (callers normally ignore it)
+        """
+        task = asyncio.create_task(self._send_notification_bounded(message))
+        self._pending_notifications.add(task)
+        task.add_done_callback(self._pending_notifications.discard)
+        return task
+
+    async def drain(self):
+        """
+        Wait for the background notification sends to finish.
+
+        Only tasks on the running event loop can be awaited. Sends queued on
+        another loop (e.g. the worker's loop, when called from the shutdown
+        hook) are dropped and counted in a warning.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [task for task in self._pending_notifications if task.get_loop() is loop]
+            if not pending:
+                break
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        dropped = sum(1 for task in self._pending_notifications if not task.done())
+        if dropped:
+            logger.warning(f"Dropping {dropped} completion notifications queued on another event loop")
+
+    async def _send_notification_bounded(self, message: Dict[str, Any]):
+        async with self._notification_semaphore:
+            await self.send_completion_notification(message)
+
+    async def _get_sender(self):
+        """Return the shared completion-queue sender, opening it on first use."""
+        if self._sender is None:
+            async with self._sender_lock:
+                if self._sender is None:
+                    if self._sb_client is None:
+                        # Managed identity when the namespace is configured,
+                        # connection string otherwise (local development)
+                        if self.config.servicebus_fqns:
+                            self._sb_client = ServiceBusClient(
+                                self.config.servicebus_fqns,
+                                credential=get_credential(),
+                                **SERVICEBUS_RETRY_KWARGS
+                            )
+                        else:
+                            self._sb_client = ServiceBusClient.from_connection_string(
+                                self.config.servicebus_connection,
+                                **SERVICEBUS_RETRY_KWARGS
+                            )
+                    sender = self._sb_client.get_queue_sender(self.config.completion_queue)
+                    # Open the link here so concurrent first sends share it
+                    await sender.__aenter__()
+                    self._sender = sender
+        return self._sender
+
+    def _build_notification(self, message: Dict[str, Any]) -> ServiceBusMessage:
+        """
+        Create the Service Bus message for a completion event.
+
+        MESSAGE PROPERTIES:
+        - Content: JSON serialized event data (orjson bytes, no str round trip)
+        - Content-Type: Enables message routing and filtering
+        - Session ID: Can be added for ordered processing
+        - Message ID: Idempotency key; the completion queue has duplicate
+          detection enabled, so a resent notification for the same document
+          and status within the detection window is dropped by Service Bus
+        """
+        body = orjson.dumps(message)
+        document_id = message.get("documentId")
+        if document_id:
+            message_id = f"{document_id}:{message.get('status', '')}"
+        else:
+            # No natural key: fall back to a content hash of the payload
+            message_id = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return ServiceBusMessage(
+            body,
+            content_type="application/json",
+            message_id=message_id
+        )
+
+    def _get_blob_client(self, container_name: str, blob_name: str) -> BlobClient:
+        """Return a client for a blob, reusing the cached container client."""
+        container_client = self._container_clients.get(container_name)
+        if container_client is None:
+            container_client = self.blob_service_client.get_container_client(container_name)
+            self._container_clients[container_name] = container_client
+        return container_client.get_blob_client(blob_name)
+
+    async def _copy_blob(
+        self,
+        source_client,
+        dest_client,
+        metadata: Optional[Dict[str, str]] = None
+    ):
+        """
+        Server-side copy a blob and wait until the copy has committed.
+
+        The destination keeps the source's content settings, and its metadata
+        too unless `metadata` is given (which replaces it).
+
+        Copies within one storage account normally complete synchronously, in
+        which case the copy response already reports success and no waiting
+        is needed. Otherwise the copy status is polled with exponential
+        backoff.
+
+        Raises:
+            RuntimeError: If the copy fails, is aborted, or does not complete
+                within COPY_POLL_TIMEOUT_SECONDS
+        """
+        copy = await dest_client.start_copy_from_url(source_client.url, metadata=metadata)
+        status = copy["copy_status"]
+
+        delay = COPY_POLL_INITIAL_DELAY_SECONDS
+        waited = 0.0
+        while status == "pending":
+            if waited >= COPY_POLL_TIMEOUT_SECONDS:
+                raise RuntimeError(f"Blob copy still pending after {waited:.1f}s: {dest_client.blob_name}")
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = min(delay * 2, COPY_POLL_MAX_DELAY_SECONDS)
+            properties = await dest_client.get_blob_properties()
+            status = properties.copy.status
+
+        if status != "success":
+            raise RuntimeError(f"Blob copy {status}: {dest_client.blob_name}")
+
     def _parse_blob_url(self, blob_url: str) -> Tuple[str, str]:
         """
         Parse blob URL to extract container and blob name.
@@ -487,17 +877,11 @@ class StorageService:
         # URL format: https://<account>.blob.core.windows.net/<container>/<blob>
         # Example: https://mystorageaccount.blob.core.windows.net/incoming/20241007_abc123_file.pdf
 
-        parts = blob_url.split('/')
-        if len(parts) < 5:
+        # The blob path may contain slashes (virtual directories), so only the
+        # first one after the container separates the two. Any query string
+        # (e.g. a SAS token) is not part of the blob name.
+        match = self._BLOB_URL.match(blob_url)
+        if match is None:
             raise ValueError(f"Invalid blob URL: {blob_url}")
 
-        # Index 0: https:
-        # Index 1: (empty)
-        # Index 2: account.blob.core.windows.net
-        # Index 3: container name
-        # Index 4+: blob path (may contain slashes for virtual directories)
-
-        container_name = parts[3]
-        blob_name = '/'.join(parts[4:])  # Join in case of virtual directories
-
-        return container_name, blob_name
+        return match.groups()
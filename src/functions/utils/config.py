@@ -1,40 +1,120 @@
 import os
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration class for loading environment variables."""
-
-    def __init__(self):
-        # Anthropic API
-        self.anthropic_api_key: str = os.getenv("ANTHROPIC_API_KEY", "")
-        self.claude_model: str = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
-        self.max_tokens: int = int(os.getenv("MAX_TOKENS", "4096"))
-
-        # Azure Storage
-        self.document_storage_connection: str = os.getenv("DOCUMENT_STORAGE_CONNECTION", "")
-        self.incoming_container: str = os.getenv("INCOMING_CONTAINER", "documents-incoming")
-        self.processed_container: str = os.getenv("PROCESSED_CONTAINER", "documents-processed")
-        self.failed_container: str = os.getenv("FAILED_CONTAINER", "documents-failed")
-
-        # Cosmos DB
-        self.cosmos_endpoint: str = os.getenv("COSMOS_ENDPOINT", "")
-        self.cosmos_database: str = os.getenv("COSMOS_DATABASE", "Application")
-        self.cosmos_documents_container: str = os.getenv("COSMOS_DOCUMENTS_CONTAINER", "Documents")
-        self.cosmos_extracted_container: str = os.getenv("COSMOS_EXTRACTED_CONTAINER", "ExtractedData")
-        self.cosmos_jobs_container: str = os.getenv("COSMOS_JOBS_CONTAINER", "ProcessingJobs")
-
-        # Service Bus
-        self.servicebus_connection: str = os.getenv("SERVICEBUS_CONNECTION", "")
-        self.processing_queue: str = os.getenv("PROCESSING_QUEUE", "document-processing")
-        self.completion_queue: str = os.getenv("COMPLETION_QUEUE", "document-extraction-complete")
-
-        # Configuration
-        self.max_document_size_mb: int = int(os.getenv("MAX_DOCUMENT_SIZE_MB", "50"))
-        self.enable_detailed_logging: bool = os.getenv("ENABLE_DETAILED_LOGGING", "false").lower() == "true"
-
-        # Feature Flags
-        self.enable_mock_ai: bool = os.getenv("ENABLE_MOCK_AI", "false").lower() == "true"
+    """
+    Application configuration, loaded from environment variables.
+
+    Immutable, so a single instance can be shared by every service and
+    concurrent invocation. Build it with Config.from_env() (or get_config()).
+    """
+
+    # Anthropic API
+    anthropic_api_key: str
+    claude_model: str
+    max_tokens: int
+    # Documents larger than this are sent via the Files API instead of inline base64
+    files_api_threshold_bytes: int
+
+    # Message Batches API (bulk extraction via ClaudeBatchProcessor)
+    claude_batch_size: int
+    claude_batch_max_wait_seconds: float
+    claude_batch_poll_seconds: float
+
+    # Azure Storage
+    document_storage_connection: str
+    # Blob endpoint (https://<account>.blob.core.windows.net); when set, the
+    # managed identity is used instead of the connection string
+    blob_account_url: str
+    incoming_container: str
+    processed_container: str
+    failed_container: str
+    # Parallel range requests per blob download (blobs over the SDK's
+    # 32 MB single-get size are fetched in 4 MB chunks)
+    blob_download_concurrency: int
+
+    # Cosmos DB
+    cosmos_endpoint: str
+    cosmos_database: str
+    cosmos_documents_container: str
+    cosmos_extracted_container: str
+    cosmos_jobs_container: str
+    # Entries are full ExtractedData items (rawResponse, extractedFields), often
+    # tens of KB each, so the cache stays small on Consumption-plan workers
+    extracted_data_cache_size: int
+    extracted_data_cache_ttl_seconds: float
+
+    # Service Bus
+    servicebus_connection: str
+    # Namespace host (<namespace>.servicebus.windows.net); when set, the
+    # managed identity is used to send instead of the connection string
+    servicebus_fqns: str
+    processing_queue: str
+    completion_queue: str
+    # Maximum completion notifications being sent in the background at once
+    notification_concurrency: int
+
+    # Service Bus trigger concurrency. The runtime reads these from host.json
+    # (extensions.serviceBus.maxConcurrentCalls and
+    # extensions.serviceBus.prefetchCount, the Service Bus extension 5.x
+    # layout shipped by extension bundle 4.x); deployments keep both in sync via
+    # AzureFunctionsJobHost__ app setting overrides. Prefetch should be
+    # 2 * max_concurrent_calls. Lower concurrency makes the scale controller
+    # add instances instead of piling invocations onto one worker.
+    max_concurrent_calls: int
+    prefetch_count: int
+
+    # Configuration
+    max_document_size_mb: int
+    max_document_size_bytes: int
+    enable_detailed_logging: bool
+
+    # Feature Flags
+    enable_mock_ai: bool
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Load the configuration from environment variables."""
+        max_concurrent_calls = int(os.getenv("MAX_CONCURRENT_CALLS", "32"))
+        max_document_size_mb = int(os.getenv("MAX_DOCUMENT_SIZE_MB", "50"))
+        return cls(
+            anthropic_api_key=os.getenv("ANTHROPIC_API_KEY", ""),
+            claude_model=os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022"),
+            max_tokens=int(os.getenv("MAX_TOKENS", "4096")),
+            files_api_threshold_bytes=int(
+                float(os.getenv("FILES_API_THRESHOLD_MB", "5")) * 1024 * 1024
+            ),
+            claude_batch_size=int(os.getenv("CLAUDE_BATCH_SIZE", "100")),
+            claude_batch_max_wait_seconds=float(os.getenv("CLAUDE_BATCH_MAX_WAIT_SECONDS", "30")),
+            claude_batch_poll_seconds=float(os.getenv("CLAUDE_BATCH_POLL_SECONDS", "30")),
+            document_storage_connection=os.getenv("DOCUMENT_STORAGE_CONNECTION", ""),
+            blob_account_url=os.getenv("DOCUMENT_STORAGE_ACCOUNT_URL", ""),
+            incoming_container=os.getenv("INCOMING_CONTAINER", "documents-incoming"),
+            processed_container=os.getenv("PROCESSED_CONTAINER", "documents-processed"),
+            failed_container=os.getenv("FAILED_CONTAINER", "documents-failed"),
+            blob_download_concurrency=int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", "8")),
+            cosmos_endpoint=os.getenv("COSMOS_ENDPOINT", ""),
+            cosmos_database=os.getenv("COSMOS_DATABASE", "Application"),
+            cosmos_documents_container=os.getenv("COSMOS_DOCUMENTS_CONTAINER", "Documents"),
+            cosmos_extracted_container=os.getenv("COSMOS_EXTRACTED_CONTAINER", "ExtractedData"),
+            cosmos_jobs_container=os.getenv("COSMOS_JOBS_CONTAINER", "ProcessingJobs"),
+            extracted_data_cache_size=int(os.getenv("EXTRACTED_DATA_CACHE_SIZE", "500")),
+            extracted_data_cache_ttl_seconds=float(os.getenv("EXTRACTED_DATA_CACHE_TTL_SECONDS", "60")),
+            servicebus_connection=os.getenv("SERVICEBUS_CONNECTION", ""),
+            servicebus_fqns=os.getenv("SERVICEBUS_FQNS", ""),
+            processing_queue=os.getenv("PROCESSING_QUEUE", "document-processing"),
+            completion_queue=os.getenv("COMPLETION_QUEUE", "document-extraction-complete"),
+            notification_concurrency=int(os.getenv("NOTIFICATION_CONCURRENCY", "16")),
+            max_concurrent_calls=max_concurrent_calls,
+            prefetch_count=int(os.getenv("PREFETCH_COUNT", str(2 * max_concurrent_calls))),
+            max_document_size_mb=max_document_size_mb,
+            max_document_size_bytes=max_document_size_mb * 1024 * 1024,
+            enable_detailed_logging=os.getenv("ENABLE_DETAILED_LOGGING", "false").lower() == "true",
+            enable_mock_ai=os.getenv("ENABLE_MOCK_AI", "false").lower() == "true",
+        )
 
     def validate(self) -> bool:
         """Validate that required configuration is present."""
@@ -45,3 +125,17 @@ class Config:
             raise ValueError("COSMOS_ENDPOINT is required")
 
         return True
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Return the process-wide configuration, loaded and validated once.
+
+    Raises:
+        ValueError: If required settings are missing (not cached, so a fixed
+            environment is picked up on the next call)
+    """
+    config = Config.from_env()
+    config.validate()
+    return config
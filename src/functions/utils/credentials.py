@@ -0,0 +1,20 @@
+from functools import lru_cache
+from azure.identity.aio import DefaultAzureCredential
+
+
+@lru_cache(maxsize=1)
+def get_credential() -> DefaultAzureCredential:
+    """
+    Return the process-wide Azure AD credential.
+
+    Sharing one credential lets every client reuse the same token cache, so a
+    token is acquired once per scope instead of once per client.
+    """
+    return DefaultAzureCredential()
+
+
+async def close_credential():
+    """Close the process-wide credential, if one was created, and forget it."""
+    if get_credential.cache_info().currsize:
+        await get_credential().close()
+        get_credential.cache_clear()
@@ -0,0 +1,14 @@
+class PermanentDocumentError(ValueError):
+    """Raised when a document can never be processed as uploaded.
+
+    Retrying cannot succeed, so callers route these documents to manual
+    review instead of letting Service Bus redeliver them.
+    """
+
+
+class DocumentTooLargeError(PermanentDocumentError):
+    """Raised when a document exceeds the configured maximum size."""
+
+
+class EmptyDocumentError(PermanentDocumentError):
+    """Raised when a document blob has no content."""
@@ -92,6 +92,16 @@ variable "max_document_size_mb" {
   }
 }
 
+variable "max_concurrent_calls" {
+  description = "Service Bus messages processed concurrently per Function instance (prefetch is twice this)"
+  type        = number
+  default     = 32
+  validation {
+    condition     = var.max_concurrent_calls > 0
+    error_message = "Max concurrent calls must be at least 1."
+  }
+}
+
 variable "document_retention_days" {
   description = "Number of days to retain processed documents before archiving"
   type        = number